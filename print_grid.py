@@ -4,134 +4,224 @@
 
 """Fetch a Google Doc of coordinate/character data and print the grid."""
 
+import functools
+import io
 import re
 import sys
-from urllib.request import urlopen
+from urllib.request import Request, urlopen
+
+_DOC_PATH_RE = re.compile(r"/document/d/([A-Za-z0-9_-]+)")
+_DOC_QUERY_RE = re.compile(r"[?&]id=([A-Za-z0-9_-]+)")
+_SEP_RE = re.compile(r"[\s,]+")
+_DIGIT_RE = re.compile(r"\d")
+_INT_LEAD = frozenset("+-0123456789")
+
+# A base-10 integer as `int()` accepts it, including `_` digit separators.
+_INT = r"[-+]?\d+(?:_\d+)*"
+
+
+def _int_tok(name):
+    return rf"(?P<{name}>{_INT})(?![^\s,])"
+
+
+def _char_tok(name):
+    # Any token that is neither an integer nor made only of quotes; the
+    # group captures it with surrounding quotes already trimmed.  The group
+    # can neither start nor end on a quote, so each quote belongs to exactly
+    # one part of the pattern and a long run of them cannot backtrack.
+    return (
+        rf"(?!{_INT}(?![^\s,]))"
+        rf"['\"]*(?P<{name}>[^\s,'\"](?:[^\s,]*[^\s,'\"])?)['\"]*(?![^\s,])"
+    )
+
+
+# Whole-line grammar, tried with a single `match` per line.  A line that is
+# a bare integer (one end of a vertical triplet) is `n`.  Otherwise a
+# `U+HEX x y` token anywhere on the line wins, then the leftmost inline
+# triplet of `[\s,]`-separated tokens, shapes tried in the order listed.
+# The name of the last group (`m.lastgroup`) identifies which branch matched.
+_LINE_RE = re.compile(
+    rf"(?P<n>{_INT})$"
+    r"|.*?U\+(?P<hex>[0-9A-Fa-f]{4,6})\s+(?P<ux>-?\d+)\s+(?P<uy>-?\d+)"
+    r"|.*?(?<![^\s,])(?:"
+    + r"[\s,]+".join((_int_tok("x1"), _int_tok("y1"), _char_tok("c1")))
+    + "|"
+    + r"[\s,]+".join((_int_tok("x2"), _char_tok("c2"), _int_tok("y2")))
+    + "|"
+    + r"[\s,]+".join((_char_tok("c3"), _int_tok("x3"), _int_tok("y3")))
+    + ")"
+)
 
 
 def extract_doc_id(url):
-    m = re.search(r"/document/d/([A-Za-z0-9_-]+)", url)
+    m = _DOC_PATH_RE.search(url)
     if m:
         return m.group(1)
-    m = re.search(r"[?&]id=([A-Za-z0-9_-]+)", url)
+    m = _DOC_QUERY_RE.search(url)
     return m.group(1) if m else None
 
 
-def fetch_url_text(url, timeout=10):
-    from urllib.request import Request, urlopen
-
+def fetch_url_lines(url, timeout=10):
+    """Open `url` and return an iterator over its decoded lines."""
     req = Request(url, headers={"User-Agent": "Mozilla/5.0 (compatible)"})
-    with urlopen(req, timeout=timeout) as fh:
-        return fh.read().decode("utf-8", errors="replace")
+    # Open eagerly so connection errors surface here, not on first iteration.
+    fh = urlopen(req, timeout=timeout)
+    return _iter_lines(fh)
+
+
+def _iter_lines(fh):
+    with fh:
+        # TextIOWrapper only breaks on \n and \r; split each of its lines
+        # again so \v, \f, \u2028 etc. end lines as `str.splitlines` does.
+        for line in io.TextIOWrapper(fh, encoding="utf-8", errors="replace"):
+            yield from line.splitlines()
+
+
+@functools.lru_cache(maxsize=32)
+def _fetch_lines_cached(url):
+    return tuple(fetch_url_lines(url))
 
 
-def fetch_doc_text(url):
-    """Return text for `url`. Prefer Google Docs txt export when possible."""
+def fetch_doc_text(url, cached=False):
+    """Return lines for `url`. Prefer Google Docs txt export when possible.
+
+    Lines are streamed from the response. With `cached=True` the document
+    is read into memory and kept in a 32-entry cache, so repeat calls for
+    the same document (by doc ID when one can be extracted) skip the
+    network. Cached entries never expire; to pick up later edits, clear
+    them with `_fetch_lines_cached.cache_clear()`.
+    """
+    fetch = _fetch_lines_cached if cached else fetch_url_lines
     doc_id = extract_doc_id(url)
     if doc_id:
         export = f"https://docs.google.com/document/d/{doc_id}/export?format=txt"
         try:
-            return fetch_url_text(export)
+            return fetch(export)
         except Exception:
             pass
-    return fetch_url_text(url)
+    return fetch(url)
 
 
-def is_int(s):
-    try:
-        int(s)
-        return True
-    except Exception:
-        return False
+@functools.lru_cache(maxsize=256)
+def _hex_to_char(h):
+    return chr(int(h, 16))
 
 
-def parse_text_to_points(text):
+def parse_text_to_points(lines):
     """Return mapping (x,y) -> character.
 
+    `lines` is an iterable of text lines; a plain string is split first.
     Handles inline triplets (e.g. `x y char`), `U+HEX x y` tokens, and
     vertical triplets where three consecutive lines are `x`, `char`, `y`.
     """
-    points = {}
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    xs, ys, chs = _parse_columns(lines)
+    return dict(zip(zip(xs, ys), chs))
 
-    ru = re.compile(r"U\+([0-9A-Fa-f]{4,6})\s+(-?\d+)\s+(-?\d+)")
+
+def _parse_columns(lines):
+    """Return parallel `(xs, ys, chs)` lists in assignment order.
+
+    Later entries override earlier ones for the same cell, so replaying
+    them in order gives the same result as `parse_text_to_points`.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    xs, ys, chs = [], [], []
+    vxs, vys, vchs = [], [], []
+    # Sliding window over the previous two lines for vertical triplets;
+    # each line's integer value is computed once and carried along.
+    prev2_int = prev1_int = None
+    prev1 = ""
 
     malformed_inline = 0
-    for line in lines:
-        m = ru.search(line)
-        if m:
-            ch = chr(int(m.group(1), 16))
-            x = int(m.group(2))
-            y = int(m.group(3))
-            points[(x, y)] = ch
+    for raw in lines:
+        line = raw.strip()
+
+        # A line without digits cannot hold a triplet; skip matching it.
+        if line and (line[0] in _INT_LEAD or _DIGIT_RE.search(line)):
+            m = _LINE_RE.match(line)
+        else:
+            m = None
+        kind = m.lastgroup if m else None
+        cur_int = int(m["n"]) if kind == "n" else None
+
+        if prev2_int is not None and prev1_int is None and prev1 and cur_int is not None:
+            vxs.append(prev2_int)
+            vys.append(cur_int)
+            vchs.append(prev1)
+        prev2_int, prev1_int, prev1 = prev1_int, cur_int, line
+
+        if m is None:
+            if line and len(_SEP_RE.split(line)) >= 3:
+                malformed_inline += 1
             continue
 
-        toks = re.split(r"[\s,]+", line)
-        if len(toks) < 3:
+        if kind == "n":
             continue
-
-        found = False
-        for i in range(len(toks) - 2):
-            a, b, c = toks[i], toks[i + 1], toks[i + 2]
-            if is_int(a) and is_int(b) and not is_int(c):
-                token = c.strip("'\"")
-                if token:
-                    points[(int(a), int(b))] = token
-                    found = True
-                    break
-            if is_int(a) and not is_int(b) and is_int(c):
-                token = b.strip("'\"")
-                if token:
-                    points[(int(a), int(c))] = token
-                    found = True
-                    break
-            if not is_int(a) and is_int(b) and is_int(c):
-                token = a.strip("'\"")
-                if token:
-                    points[(int(b), int(c))] = token
-                    found = True
-                    break
-        if not found:
-            malformed_inline += 1
-
-    raw_lines = text.splitlines()
-    for i in range(len(raw_lines) - 2):
-        a_raw, b_raw, c_raw = raw_lines[i], raw_lines[i + 1], raw_lines[i + 2]
-        a, b, c = a_raw.strip(), b_raw.strip(), c_raw.strip()
-        if is_int(a) and (not is_int(b)) and is_int(c) and b:
-            points[(int(a), int(c))] = b
+        if kind == "uy":
+            x, y, ch = m["ux"], m["uy"], _hex_to_char(m["hex"])
+        elif kind == "c1":
+            x, y, ch = m.group("x1", "y1", "c1")
+        elif kind == "y2":
+            x, ch, y = m.group("x2", "c2", "y2")
+        else:
+            ch, x, y = m.group("c3", "x3", "y3")
+        xs.append(int(x))
+        ys.append(int(y))
+        chs.append(ch)
+
+    # Vertical triplets win over inline ones for the same cell.
+    xs.extend(vxs)
+    ys.extend(vys)
+    chs.extend(vchs)
 
     if malformed_inline > 0:
         print(f"Warning: {malformed_inline} inline lines were ignored (malformed)", file=sys.stderr)
 
-    return points
+    return xs, ys, chs
+
 
+def _scatter(buf, stride, origin, xs, ys, cells):
+    """Write `cells` into the flat row-major `buf` at the given coordinates.
 
-def print_grid_from_doc_url(url):
+    `origin` is the flat offset of the top-left cell.  Points are replayed
+    in order, so the last assignment to a cell wins.
+    """
+    for x, y, c in zip(xs, ys, cells):
+        buf[y * stride + x - origin] = c
+
+
+def print_grid_from_doc_url(url, cached=False):
     """Fetch `url`, parse points, and print the assembled grid.
 
-    Y increases downward (row 0 is the top).
+    Y increases downward (row 0 is the top). `cached` is passed to
+    `fetch_doc_text`.
     """
-    text = fetch_doc_text(url)
-    points = parse_text_to_points(text)
-    if not points:
+    xs, ys, chs = _parse_columns(fetch_doc_text(url, cached=cached))
+    if not xs:
         print("No coordinate data found")
         return
 
-    xs = [x for (x, y) in points.keys()]
-    ys = [y for (x, y) in points.keys()]
     min_x, max_x = min(xs), max(xs)
     min_y, max_y = min(ys), max(ys)
 
     width = max_x - min_x + 1
     height = max_y - min_y + 1
 
-    grid = [[" " for _ in range(width)] for _ in range(height)]
-    for (x, y), ch in points.items():
-        grid[y - min_y][x - min_x] = ch
-
-    for row in grid:
-        print("".join(row))
+    # One flat buffer, each row followed by its newline.  Single-character
+    # ASCII glyphs go into a bytearray; anything else uses a list of cells.
+    stride = width + 1
+    glyphs = "".join(chs)
+    if len(glyphs) == len(chs) and glyphs.isascii():
+        buf = bytearray((b" " * width + b"\n") * height)
+        cells = glyphs.encode("ascii")
+    else:
+        buf = ([" "] * width + ["\n"]) * height
+        cells = chs
+
+    _scatter(buf, stride, min_y * stride + min_x, xs, ys, cells)
+    sys.stdout.write(buf.decode("ascii") if isinstance(buf, bytearray) else "".join(buf))
 
 
 def _cli(argv):
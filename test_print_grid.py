@@ -0,0 +1,231 @@
+import contextlib
+import io
+import time
+import unittest
+import urllib.request
+from unittest import mock
+
+import print_grid
+
+
+def parse(text):
+    err = io.StringIO()
+    with contextlib.redirect_stderr(err):
+        points = print_grid.parse_text_to_points(text)
+    return points, err.getvalue()
+
+
+def render(text):
+    out = io.StringIO()
+    with mock.patch.object(print_grid, "fetch_doc_text", return_value=text):
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            print_grid.print_grid_from_doc_url("https://example.invalid/doc")
+    return out.getvalue()
+
+
+class FetchTests(unittest.TestCase):
+    def setUp(self):
+        print_grid._fetch_lines_cached.cache_clear()
+        self.addCleanup(print_grid._fetch_lines_cached.cache_clear)
+
+    def fetch(self, url, *responses, cached=False):
+        opener = mock.Mock(side_effect=list(responses))
+        with mock.patch.object(print_grid, "urlopen", opener):
+            lines = list(print_grid.fetch_doc_text(url, cached=cached))
+        return lines, [call.args[0] for call in opener.call_args_list]
+
+    def test_prefers_txt_export(self):
+        url = "https://docs.google.com/document/d/abc_123/edit"
+        lines, requests = self.fetch(url, io.BytesIO(b"1 2 #\n"))
+        self.assertEqual(lines, ["1 2 #"])
+        self.assertEqual(
+            [req.full_url for req in requests],
+            ["https://docs.google.com/document/d/abc_123/export?format=txt"],
+        )
+        self.assertEqual(requests[0].get_header("User-agent"), "Mozilla/5.0 (compatible)")
+
+    def test_falls_back_to_original_url(self):
+        url = "https://docs.google.com/document/d/abc/edit"
+        lines, requests = self.fetch(url, OSError("export failed"), io.BytesIO(b"1 2 #"))
+        self.assertEqual(lines, ["1 2 #"])
+        self.assertEqual(requests[1].full_url, url)
+
+    def test_splits_lines_like_str_splitlines(self):
+        body = "1 2 #\x0b3 4 $\x0c5 6 %\u20287 8 &\x1c9 9 *\r\n\r\n4\r@\n9"
+        lines, _ = self.fetch("https://example.invalid/doc", io.BytesIO(body.encode()))
+        self.assertEqual(lines, body.splitlines())
+        points, _ = parse(lines)
+        self.assertEqual(points, parse(body)[0])
+        self.assertEqual(len(points), 6)
+
+    def test_uses_installed_opener(self):
+        class FakeHandler(urllib.request.BaseHandler):
+            def fake_open(self, req):
+                body = io.BytesIO(b"1 2 #\n")
+                return urllib.response.addinfourl(body, {}, req.full_url, 200)
+
+        urllib.request.install_opener(urllib.request.build_opener(FakeHandler))
+        self.addCleanup(urllib.request.install_opener, None)
+        self.assertEqual(list(print_grid.fetch_url_lines("fake://doc")), ["1 2 #"])
+
+    def test_streams_without_caching_by_default(self):
+        url = "https://docs.google.com/document/d/abc/edit"
+        opener = mock.Mock(side_effect=[io.BytesIO(b"1 2 #\n3 4 $")])
+        with mock.patch.object(print_grid, "urlopen", opener):
+            lines = print_grid.fetch_doc_text(url)
+            self.assertNotIsInstance(lines, (list, tuple))
+            self.assertEqual(next(lines), "1 2 #")
+        self.assertEqual(print_grid._fetch_lines_cached.cache_info().currsize, 0)
+
+    def test_repeat_fetch_is_cached_when_requested(self):
+        url = "https://docs.google.com/document/d/abc/edit"
+        self.fetch(url, io.BytesIO(b"1 2 #"), cached=True)
+        lines, requests = self.fetch("https://docs.google.com/document/d/abc/view", cached=True)
+        self.assertEqual(lines, ["1 2 #"])
+        self.assertEqual(requests, [])
+        lines, requests = self.fetch(url, io.BytesIO(b"1 2 $"))
+        self.assertEqual(lines, ["1 2 $"])
+        self.assertEqual(len(requests), 1)
+
+
+class InlineTests(unittest.TestCase):
+    def test_triplet_shapes(self):
+        points, _ = parse("1 2 #\n3 x 4\ny 5 6")
+        self.assertEqual(points, {(1, 2): "#", (3, 4): "x", (5, 6): "y"})
+
+    def test_separators(self):
+        points, _ = parse("1,2,#\n3, 4 ,$\n,5\t6 %")
+        self.assertEqual(points, {(1, 2): "#", (3, 4): "$", (5, 6): "%"})
+
+    def test_signed_coordinates(self):
+        points, _ = parse("-1 +2 #")
+        self.assertEqual(points, {(-1, 2): "#"})
+
+    def test_leftmost_triplet_wins(self):
+        points, _ = parse("label a 1 2 # 3 4 $")
+        self.assertEqual(points, {(1, 2): "a"})
+
+    def test_first_shape_wins_within_a_window(self):
+        # `1 2 x` (x y c) is tried before `2 x 3` (x c y).
+        points, _ = parse("1 2 x 3")
+        self.assertEqual(points, {(1, 2): "x"})
+
+    def test_tokens_are_matched_whole(self):
+        points, err = parse("a12 5 #")
+        self.assertEqual(points, {})
+        self.assertIn("1 inline lines were ignored", err)
+
+    def test_underscore_digit_separators(self):
+        # Integers follow int(): single `_` between digits is allowed.
+        points, err = parse("1 1 1_0\n1_0 x 4\n1__0 2 #\n_1 2 3")
+        self.assertEqual(points, {(10, 4): "x", (2, 3): "_1"})
+        self.assertIn("2 inline lines were ignored", err)
+        points, _ = parse("1_0\n#\n2")
+        self.assertEqual(points, {(10, 2): "#"})
+
+    def test_all_integer_line_is_malformed(self):
+        points, err = parse("1 2 3")
+        self.assertEqual(points, {})
+        self.assertIn("1 inline lines were ignored", err)
+
+    def test_short_lines_are_not_counted_as_malformed(self):
+        points, err = parse("hello\nfoo bar\n\n")
+        self.assertEqual(points, {})
+        self.assertEqual(err, "")
+
+
+class QuotedGlyphTests(unittest.TestCase):
+    def test_quotes_are_stripped(self):
+        points, _ = parse("1 2 '#'\n3 \"x\" 4\n''y 5 6")
+        self.assertEqual(points, {(1, 2): "#", (3, 4): "x", (5, 6): "y"})
+
+    def test_inner_quotes_are_kept(self):
+        points, _ = parse("1 2 'a'b'")
+        self.assertEqual(points, {(1, 2): "a'b"})
+
+    def test_quote_only_token_is_skipped(self):
+        points, _ = parse("'' 1 2 x")
+        self.assertEqual(points, {(1, 2): "x"})
+
+    def test_quoted_digits_are_a_glyph(self):
+        points, _ = parse("1 2 '5'")
+        self.assertEqual(points, {(1, 2): "5"})
+
+    def test_long_quote_runs_parse_quickly(self):
+        quotes = "'" * 2000
+        cases = [
+            ("1 " + quotes + "a", {}),
+            ("1 2 " + quotes + "a", {(1, 2): "a"}),
+            ("1 2 " + quotes, {}),
+            (quotes + " 1 2", {}),
+        ]
+        for text, expected in cases:
+            start = time.perf_counter()
+            points, _ = parse(text)
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertEqual(points, expected)
+
+
+class UplusTests(unittest.TestCase):
+    def test_hex_code_point(self):
+        points, _ = parse("U+2588 3 4\nU+0041 0 0")
+        self.assertEqual(points, {(3, 4): "█", (0, 0): "A"})
+
+    def test_uplus_wins_over_earlier_triplet(self):
+        points, _ = parse("1 2 # U+0041 7 8")
+        self.assertEqual(points, {(7, 8): "A"})
+
+
+class VerticalTests(unittest.TestCase):
+    def test_vertical_triplet(self):
+        points, _ = parse("3\n#\n4")
+        self.assertEqual(points, {(3, 4): "#"})
+
+    def test_overlapping_windows(self):
+        points, _ = parse("1\n#\n2\n$\n3")
+        self.assertEqual(points, {(1, 2): "#", (2, 3): "$"})
+
+    def test_blank_line_breaks_triplet(self):
+        points, _ = parse("1\n\n#\n2")
+        self.assertEqual(points, {})
+
+    def test_unicode_digits(self):
+        points, _ = parse("٥\n#\n٣")
+        self.assertEqual(points, {(5, 3): "#"})
+
+
+class OverrideTests(unittest.TestCase):
+    def test_later_inline_point_wins(self):
+        points, _ = parse("1 1 a\n1 1 b")
+        self.assertEqual(points, {(1, 1): "b"})
+
+    def test_vertical_wins_over_later_inline(self):
+        points, _ = parse("1\n#\n1\n1 1 x")
+        self.assertEqual(points, {(1, 1): "#"})
+
+    def test_grid_keeps_last_assignment(self):
+        self.assertEqual(render("0 0 a\n0 0 b\n1 0 c"), "bc\n")
+
+
+class GridTests(unittest.TestCase):
+    def test_ascii_grid(self):
+        self.assertEqual(render("0 0 #\n2 1 $"), "#  \n  $\n")
+
+    def test_offset_origin(self):
+        self.assertEqual(render("-1 -1 a\n0 0 b"), "a \n b\n")
+
+    def test_non_ascii_and_multi_char_glyphs(self):
+        self.assertEqual(render("0 0 █\n1 0 ab"), "█ab\n")
+
+    def test_coordinates_beyond_c_int_range(self):
+        text = "5000000000 1 #\n5000000001 1 $"
+        points, _ = parse(text)
+        self.assertEqual(points, {(5000000000, 1): "#", (5000000001, 1): "$"})
+        self.assertEqual(render(text), "#$\n")
+
+    def test_no_points(self):
+        self.assertEqual(render("nothing here"), "No coordinate data found\n")
+
+
+if __name__ == "__main__":
+    unittest.main()